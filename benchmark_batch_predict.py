@@ -0,0 +1,37 @@
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+# --- Compare one stacked predict against one predict per location ---
+
+feature_cols = [
+    'carbon_monoxide', 'cloud_coverage', 'day', 'hour', 'humidity', 'is_weekend',
+    'month', 'nitrogen_dioxide', 'ozone', 'pm_ratio', 'pm10', 'pm10_lag1', 'pm10_lag3',
+    'pm2_5', 'pm2_5_lag1', 'pm2_5_lag3', 'pm2_5_roll_mean_3', 'pm2_5_roll_std_6',
+    'pressure', 'temp_humidity_index', 'temperature', 'temperature_lag1', 'temperature_lag3',
+    'temperature_roll_mean_3', 'temperature_roll_std_6', 'weekday', 'wind_deg', 'wind_speed'
+]
+
+model = joblib.load("models/pm2_5_model_day1_best.pkl")
+rng = np.random.default_rng(42)
+
+for n_locations in [1, 10, 50, 200]:
+    locations = [f"station_{i}" for i in range(n_locations)]
+    rows = pd.DataFrame(rng.random((n_locations, len(feature_cols))), columns=feature_cols, index=locations)
+
+    start = time.perf_counter()
+    per_location = {loc: float(model.predict(rows.loc[[loc]])[0]) for loc in locations}
+    per_location_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = dict(zip(locations, map(float, model.predict(rows))))
+    batched_time = time.perf_counter() - start
+
+    assert np.allclose([per_location[loc] for loc in locations], [batched[loc] for loc in locations])
+
+    print(
+        f"{n_locations:>4} locations | per-location: {n_locations / per_location_time:8.1f} loc/s"
+        f" | batched: {n_locations / batched_time:8.1f} loc/s"
+        f" | speedup: {per_location_time / batched_time:5.1f}x"
+    )
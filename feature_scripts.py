@@ -2,79 +2,174 @@ import pandas as pd
 import numpy as np
 import hopsworks
 import os
+import argparse
 from dotenv import load_dotenv
 
-# --- Load API Key ---
-load_dotenv()
-api_key = os.getenv("HOPSWORKS_API_KEY")
+FEATURE_COLS = [
+    'carbon_monoxide', 'cloud_coverage', 'day', 'hour', 'humidity', 'is_weekend',
+    'month', 'nitrogen_dioxide', 'ozone', 'pm_ratio', 'pm10', 'pm10_lag1', 'pm10_lag3',
+    'pm2_5', 'pm2_5_lag1', 'pm2_5_lag3', 'pm2_5_roll_mean_3', 'pm2_5_roll_std_6',
+    'pressure', 'temp_humidity_index', 'temperature', 'temperature_lag1', 'temperature_lag3',
+    'temperature_roll_mean_3', 'temperature_roll_std_6', 'weekday', 'wind_deg', 'wind_speed'
+]
+TARGET_COLS = ["target_pm2_5_avg_day1", "target_pm2_5_avg_day2", "target_pm2_5_avg_day3"]
 
-# --- Connect to Hopsworks and load raw data ---
-project = hopsworks.login(api_key_value=api_key)
-fs = project.get_feature_store()
-fg_raw = fs.get_feature_group("karachi_aqi_raw", version=1)
+# Raw rows a new row looks back over (rolling std window of 6)
+LOOKBACK_ROWS = 5
+# Future calendar days a row's targets look ahead over
+LOOKAHEAD_DAYS = 3
 
-df = fg_raw.read()
-df["time"] = pd.to_datetime(df["time"])
-df = df.sort_values("time").reset_index(drop=True)
 
 # --- Feature Engineering ---
+def add_features(df):
+    # Time-based
+    df["is_weekend"] = df["weekday"].apply(lambda x: 1 if x >= 5 else 0)
 
-# Time-based
-df["is_weekend"] = df["weekday"].apply(lambda x: 1 if x >= 5 else 0)
+    # Lag features
+    for col in ["pm2_5", "pm10", "temperature"]:
+        df[f"{col}_lag1"] = df[col].shift(1)
+        df[f"{col}_lag3"] = df[col].shift(3)
 
-# Lag features
-for col in ["pm2_5", "pm10", "temperature"]:
-    df[f"{col}_lag1"] = df[col].shift(1)
-    df[f"{col}_lag3"] = df[col].shift(3)
+    # Rolling stats
+    for col in ["pm2_5", "temperature"]:
+        df[f"{col}_roll_mean_3"] = df[col].rolling(window=3).mean()
+        df[f"{col}_roll_std_6"] = df[col].rolling(window=6).std()
 
-# Rolling stats
-for col in ["pm2_5", "temperature"]:
-    df[f"{col}_roll_mean_3"] = df[col].rolling(window=3).mean()
-    df[f"{col}_roll_std_6"] = df[col].rolling(window=6).std()
+    # Derived
+    df["pm_ratio"] = df["pm2_5"] / (df["pm10"] + 1e-3)
+    df["temp_humidity_index"] = df["temperature"] * df["humidity"]
 
-# Derived
-df["pm_ratio"] = df["pm2_5"] / (df["pm10"] + 1e-3)
-df["temp_humidity_index"] = df["temperature"] * df["humidity"]
+    # Round timestamps to calendar days
+    df["date"] = df["time"].dt.floor("D")
+    return df
 
-# Round timestamps to calendar days
-df["date"] = df["time"].dt.floor("D")
 
 # --- Create Calendar-Day Targets ---
-
-# Step 1: Daily avg
-daily_pm = df.groupby("date")["pm2_5"].mean().reset_index()
-daily_pm.columns = ["date", "avg_pm2_5"]
-
-# Step 2: Shift to get future targets
-daily_pm["target_pm2_5_avg_day1"] = daily_pm["avg_pm2_5"].shift(-1)
-daily_pm["target_pm2_5_avg_day2"] = daily_pm["avg_pm2_5"].shift(-2)
-daily_pm["target_pm2_5_avg_day3"] = daily_pm["avg_pm2_5"].shift(-3)
-
-# Step 3: Merge with hourly df
-df = df.merge(
-    daily_pm[["date", "target_pm2_5_avg_day1", "target_pm2_5_avg_day2", "target_pm2_5_avg_day3"]],
-    on="date",
-    how="left"
-)
-
-# Only drop rows where features are NaN (NOT target NaNs)
-df = df.dropna(subset=[
-    'carbon_monoxide', 'cloud_coverage', 'day', 'hour', 'humidity', 'is_weekend',
-    'month', 'nitrogen_dioxide', 'ozone', 'pm_ratio', 'pm10', 'pm10_lag1', 'pm10_lag3',
-    'pm2_5', 'pm2_5_lag1', 'pm2_5_lag3', 'pm2_5_roll_mean_3', 'pm2_5_roll_std_6',
-    'pressure', 'temp_humidity_index', 'temperature', 'temperature_lag1', 'temperature_lag3',
-    'temperature_roll_mean_3', 'temperature_roll_std_6', 'weekday', 'wind_deg', 'wind_speed'
-]).reset_index(drop=True)
-print(df[["time", "pm2_5"]].tail(60))
-
-# --- Upload to Hopsworks ---
-fg = fs.get_or_create_feature_group(
-    name="karachi_aqi_features",
-    version=2,
-    primary_key=["time"],
-    description="Includes recent data even if future targets are missing",
-    event_time="time"
-)
-
-fg.insert(df, write_options={"wait_for_job": True})
-print("✅ Feature group v2 created and populated.")
+def daily_averages(df):
+    daily_pm = df.groupby("date")["pm2_5"].mean().reset_index()
+    daily_pm.columns = ["date", "avg_pm2_5"]
+    return daily_pm
+
+
+def add_targets(df, daily_pm):
+    # Shift to get future targets
+    daily_pm = daily_pm.copy()
+    for i, col in enumerate(TARGET_COLS, start=1):
+        daily_pm[col] = daily_pm["avg_pm2_5"].shift(-i)
+
+    # Merge with hourly df
+    df = df.merge(daily_pm[["date"] + TARGET_COLS], on="date", how="left")
+
+    # Only drop rows where features are NaN (NOT target NaNs)
+    return df.dropna(subset=FEATURE_COLS).reset_index(drop=True)
+
+
+def build_features(df):
+    df["time"] = pd.to_datetime(df["time"])
+    df = df.sort_values("time").reset_index(drop=True)
+    df = add_features(df)
+    return add_targets(df, daily_averages(df))
+
+
+def stream_features(read_chunk, bounds, write_chunk):
+    """Rebuild features over time-ordered raw chunks with bounded memory.
+
+    `bounds` are consecutive day-aligned (start, end) pairs, so each calendar
+    day lands in exactly one chunk. Only the last LOOKBACK_ROWS raw rows and
+    the last LOOKAHEAD_DAYS days of feature rows are carried between chunks,
+    which is all the lag/rolling windows and daily targets ever reach.
+    """
+    history = None   # raw rows preceding the current chunk
+    pending = None   # feature rows whose targets still need future days
+    pending_daily = None
+
+    for start, end in bounds:
+        raw = read_chunk(start, end)
+        if raw.empty:
+            continue
+        raw["time"] = pd.to_datetime(raw["time"])
+        raw = raw.sort_values("time").reset_index(drop=True)
+
+        # Prepend lookback rows so shifts/rolls see across the boundary
+        n_context = 0 if history is None else len(history)
+        context = raw if history is None else pd.concat([history, raw], ignore_index=True)
+        history = context.tail(LOOKBACK_ROWS).reset_index(drop=True)
+        chunk = add_features(context).iloc[n_context:]
+
+        daily = daily_averages(chunk)
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+            daily = pd.concat([pending_daily, daily], ignore_index=True)
+
+        # Days followed by LOOKAHEAD_DAYS known days have final targets
+        ready_dates = daily["date"].iloc[:-LOOKAHEAD_DAYS]
+        is_ready = chunk["date"].isin(ready_dates)
+        pending = chunk[~is_ready].reset_index(drop=True)
+        pending_daily = daily.iloc[len(ready_dates):].reset_index(drop=True)
+
+        if is_ready.any():
+            out = add_targets(chunk[is_ready].reset_index(drop=True), daily)
+            if not out.empty:
+                write_chunk(out)
+
+    # Remaining days never get a full set of future days
+    if pending is not None and not pending.empty:
+        out = add_targets(pending, pending_daily)
+        if not out.empty:
+            write_chunk(out)
+
+
+def day_bounds(times, chunk_days):
+    first = times.min().floor("D")
+    last = times.max().floor("D") + pd.Timedelta(days=1)
+    edges = list(pd.date_range(first, last, freq=f"{chunk_days}D"))
+    if edges[-1] < last:
+        edges.append(last)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Engineer AQI features from the raw feature group")
+    parser.add_argument(
+        "--chunk-days", type=int, default=None,
+        help="Rebuild in streaming mode, reading this many days of raw history at a time"
+    )
+    args = parser.parse_args()
+
+    # --- Load API Key ---
+    load_dotenv()
+    api_key = os.getenv("HOPSWORKS_API_KEY")
+
+    # --- Connect to Hopsworks ---
+    project = hopsworks.login(api_key_value=api_key)
+    fs = project.get_feature_store()
+    fg_raw = fs.get_feature_group("karachi_aqi_raw", version=1)
+
+    fg = fs.get_or_create_feature_group(
+        name="karachi_aqi_features",
+        version=2,
+        primary_key=["time"],
+        description="Includes recent data even if future targets are missing",
+        event_time="time"
+    )
+
+    if args.chunk_days is None:
+        df = build_features(fg_raw.read())
+        print(df[["time", "pm2_5"]].tail(60))
+
+        # --- Upload to Hopsworks ---
+        fg.insert(df, write_options={"wait_for_job": True})
+    else:
+        times = pd.to_datetime(fg_raw.select(["time"]).read()["time"])
+        bounds = day_bounds(times, args.chunk_days)
+
+        def read_chunk(start, end):
+            return fg_raw.filter((fg_raw.time >= start) & (fg_raw.time < end)).read()
+
+        def write_chunk(out):
+            print(f"Writing {len(out)} rows up to {out['time'].max()}")
+            fg.insert(out, write_options={"wait_for_job": True})
+
+        stream_features(read_chunk, bounds, write_chunk)
+
+    print("✅ Feature group v2 created and populated.")
@@ -34,28 +34,64 @@ class Predictor:
         self.fs = project.get_feature_store()
         self.feature_group = self.fs.get_feature_group(name="karachi_aqi_features", version=2)
 
+        # Rows without a "location" column belong to the original station
+        self.default_location = "karachi"
+
+    def _requested_locations(self, x):
+        # Deployment inputs arrive as a list of instances; location names
+        # may be passed flat or wrapped one level deep.
+        if not x:
+            return None
+        locations = []
+        for item in x:
+            if isinstance(item, str):
+                locations.append(item)
+            elif isinstance(item, (list, tuple)):
+                locations.extend(v for v in item if isinstance(v, str))
+        return locations or None
+
+    def _latest_rows(self, df, locations):
+        if "location" not in df.columns:
+            df = df.assign(location=self.default_location)
+
+        today = datetime.now(ZoneInfo("Asia/Karachi")).date()
+        df_today = df[(df["time"].dt.date == today) & (df["location"].isin(locations))]
+
+        # Latest row per location, kept in the order they were requested
+        latest = df_today.groupby("location", sort=False).tail(1).set_index("location")
+        missing = [loc for loc in locations if loc not in latest.index]
+        if missing:
+            raise ValueError(f"No valid feature row for today ({today}) at: {', '.join(missing)}")
+
+        return latest.loc[locations, self.feature_cols]
+
     def predict(self, x=None):
+        requested = self._requested_locations(x)
+        locations = list(dict.fromkeys(requested or [self.default_location]))
+
+        # One read for every location, one model call for the stacked rows
         df = self.feature_group.read()
         df["time"] = pd.to_datetime(df["time"])
         df = df.dropna(subset=self.feature_cols)
         df = df.sort_values("time", ascending=True)
-        
-        today = datetime.now(ZoneInfo("Asia/Karachi")).date()
-        df_today = df[df["time"].dt.date == today]
 
-        if df_today.empty:
-            raise ValueError(f"No valid feature row for today ({today})")
+        rows = self._latest_rows(df, locations)
 
-        row = df_today[self.feature_cols].iloc[[-1]]
-
-        X_scaled = self.x_scaler.transform(row.values)
+        X_scaled = self.x_scaler.transform(rows.values)
         X_reshaped = X_scaled.reshape((X_scaled.shape[0], 1, X_scaled.shape[1]))
 
         y_pred_scaled = self.model_obj.predict(X_reshaped)
         y_pred = self.y_scaler.inverse_transform(y_pred_scaled)
 
-        return {
-            "pm2_5_day1": float(y_pred[0, 0]),
-            "pm2_5_day2": float(y_pred[0, 1]),
-            "pm2_5_day3": float(y_pred[0, 2])
+        results = {
+            loc: {
+                "pm2_5_day1": float(y_pred[i, 0]),
+                "pm2_5_day2": float(y_pred[i, 1]),
+                "pm2_5_day3": float(y_pred[i, 2])
+            }
+            for i, loc in enumerate(locations)
         }
+
+        if requested is None:
+            return results[self.default_location]
+        return results